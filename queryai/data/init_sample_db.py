@@ -13,13 +13,30 @@ HERE = Path(__file__).resolve().parent
 DB_PATH = HERE / "sample.db"
 SCHEMA_PATH = HERE / "sample_schema.sql"
 
+# Bulk-load settings: the file is rebuilt from scratch, so durability
+# during the import is not needed.
+FAST_IMPORT_PRAGMAS = """
+PRAGMA journal_mode=OFF;
+PRAGMA synchronous=OFF;
+PRAGMA temp_store=MEMORY;
+PRAGMA locking_mode=EXCLUSIVE;
+"""
+
 
 def main() -> None:
     sql = SCHEMA_PATH.read_text(encoding="utf-8")
+    # Start from an empty file, dropping any leftover WAL/SHM sidecars too
+    for path in (DB_PATH, DB_PATH.with_name(DB_PATH.name + "-wal"), DB_PATH.with_name(DB_PATH.name + "-shm")):
+        path.unlink(missing_ok=True)
     conn = sqlite3.connect(DB_PATH)
     try:
-        conn.executescript(sql)
-        conn.commit()
+        conn.executescript(FAST_IMPORT_PRAGMAS)
+        # executescript commits any pending transaction first, so the
+        # BEGIN/COMMIT must be part of the script itself.
+        conn.executescript(f"BEGIN;\n{sql}\nCOMMIT;")
+        # Restore normal settings for runtime use
+        conn.executescript("PRAGMA locking_mode=NORMAL; PRAGMA synchronous=NORMAL;")
+        conn.execute("PRAGMA journal_mode=WAL")
         print(f"Created sample database at: {DB_PATH}")
     finally:
         conn.close()
@@ -14,7 +14,9 @@ from __future__ import annotations
 import argparse
 import sys
 
-from .src.app_core import create_agent, load_env, normalize_db_uri
+from tabulate import tabulate
+
+from .src.app_core import create_agent, get_schema_cache_dir, load_env, normalize_db_uri
 
 
 def parse_args(argv: list[str]) -> argparse.Namespace:
@@ -29,6 +31,11 @@ def parse_args(argv: list[str]) -> argparse.Namespace:
         required=False,
         help="Natural language question to ask. If omitted, you will be prompted.",
     )
+    parser.add_argument(
+        "--refresh-schema-cache",
+        action="store_true",
+        help="Re-introspect the database schema and rewrite the on-disk schema cache.",
+    )
     return parser.parse_args(argv)
 
 
@@ -46,6 +53,9 @@ def main(argv: list[str] | None = None) -> int:
         print("[ERROR] Could not connect to the SQLite database.")
         return 1
 
+    if args.refresh_schema_cache:
+        agent._db.load_or_build_schema_cache(get_schema_cache_dir(), refresh=True)  # type: ignore[attr-defined]
+
     response = agent.answer_question(question)
 
     print("\n--- Generated SQL ---")
@@ -57,8 +67,9 @@ def main(argv: list[str] | None = None) -> int:
         return 1
 
     print("\n--- Result (", response.result.rowcount, "rows ) ---", sep="")
-    # Render DataFrame as a simple text table
-    print(response.result.dataframe.to_string(index=False))
+    # Render rows as a plain text table; much cheaper than DataFrame.to_string
+    df = response.result.dataframe
+    print(tabulate(df.itertuples(index=False, name=None), headers=list(df.columns), tablefmt="plain"))
 
     return 0
 
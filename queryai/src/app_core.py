@@ -9,13 +9,14 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Optional
 
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 
-from .db_manager import DatabaseManager, build_sqlite_uri_from_path
-from .llm_engine import LLMEngine
+from .db_manager import AsyncDatabaseManager, DatabaseManager, build_sqlite_uri_from_path
+from .llm_engine import CacheHitTracker, LLMEngine
 from .text2sql_agent import TextToSQLAgent
 
 
@@ -26,6 +27,8 @@ class AppConfig:
 	temperature: float
 	api_key: Optional[str]
 	base_url: Optional[str]
+	enable_llm_cache: bool = True
+	llm_cache_path: str = ".queryai_llm_cache.db"
 
 
 def load_env() -> None:
@@ -56,24 +59,48 @@ def build_app_config_from_env() -> AppConfig:
 		or os.getenv("OPENAI_BASE_URL")
 	)
 
+	enable_llm_cache = os.getenv("QUERYAI_LLM_CACHE_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+	llm_cache_path = os.getenv("QUERYAI_LLM_CACHE", ".queryai_llm_cache.db")
+
 	return AppConfig(
 		model_name=model,
 		temperature=temperature,
 		api_key=api_key,
 		base_url=base_url,
+		enable_llm_cache=enable_llm_cache,
+		llm_cache_path=llm_cache_path,
 	)
 
 
+def configure_llm_cache(config: AppConfig) -> None:
+	"""Install LangChain's persistent SQLite response cache if enabled.
+
+	Identical prompts (same model, parameters and rendered text) are then
+	served from disk instead of hitting the LLM provider again.
+	"""
+
+	if not config.enable_llm_cache:
+		return
+
+	from langchain_community.cache import SQLiteCache
+	from langchain_core.globals import set_llm_cache
+
+	# The tracker lets usage metrics tell cache hits from billed calls
+	set_llm_cache(CacheHitTracker(SQLiteCache(database_path=config.llm_cache_path)))
+
+
 def build_llm_from_config(config: AppConfig) -> ChatOpenAI:
 	"""Construct a LangChain ChatOpenAI instance from AppConfig."""
 
-	return ChatOpenAI(
+	llm = ChatOpenAI(
 		model=config.model_name,
 		temperature=config.temperature,
 		api_key=config.api_key,
 		base_url=config.base_url,
 		max_tokens=1024,
 	)
+	configure_llm_cache(config)
+	return llm
 
 
 def normalize_db_uri(raw: str) -> str:
@@ -92,19 +119,34 @@ def normalize_db_uri(raw: str) -> str:
 	return build_sqlite_uri_from_path(raw)
 
 
-def create_agent(db_identifier: str, max_retries: int = 2) -> TextToSQLAgent:
+def get_schema_cache_dir() -> Path:
+	"""Directory for persisted schema summaries (``QUERYAI_SCHEMA_CACHE_DIR``)."""
+
+	return Path(os.getenv("QUERYAI_SCHEMA_CACHE_DIR", ".queryai_schema_cache"))
+
+
+def create_agent(
+	db_identifier: str,
+	max_retries: int = 2,
+	use_async_db: bool = False,
+) -> TextToSQLAgent:
 	"""Create a TextToSQLAgent for the given DB identifier.
 
 	The identifier can be either:
 	- A raw filesystem path to a SQLite file.
 	- A full SQLAlchemy URL (e.g. ``sqlite:///...``,
 	  ``postgresql+psycopg2://...``).
+
+	With ``use_async_db`` the agent's ``aanswer_question`` queries through
+	an AsyncDatabaseManager (requires the matching async driver). Use it
+	only from a single long-lived event loop.
 	"""
 
 	load_env()
 	config = build_app_config_from_env()
 	llm = build_llm_from_config(config)
 	db_uri = normalize_db_uri(db_identifier)
-	db = DatabaseManager(db_uri)
+	db = DatabaseManager(db_uri, schema_cache_dir=get_schema_cache_dir())
 	engine = LLMEngine(llm)
-	return TextToSQLAgent(db=db, llm_engine=engine, max_retries=max_retries)
+	async_db = AsyncDatabaseManager(db_uri) if use_async_db else None
+	return TextToSQLAgent(db=db, llm_engine=engine, max_retries=max_retries, async_db=async_db)
@@ -6,15 +6,64 @@ so it can be extended to other databases later (PostgreSQL/MySQL).
 
 from __future__ import annotations
 
+import hashlib
+import json
+import os
+import re
+import time
 from dataclasses import dataclass
-from typing import Any, Optional
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional
 
 import pandas as pd
-from sqlalchemy import create_engine, inspect, text
-from sqlalchemy.engine import Engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Connection, Engine, make_url
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import StaticPool
+
+if TYPE_CHECKING:
+	from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
 
 READ_ONLY_BLOCKLIST = ("INSERT", "UPDATE", "DELETE", "DROP", "ALTER", "TRUNCATE")
+_BLOCKLIST_RE = re.compile(
+	r"\b(?:" + "|".join(READ_ONLY_BLOCKLIST) + r")\b",
+	re.IGNORECASE,
+)
+
+# Sync driver -> asyncio driver used by AsyncDatabaseManager
+ASYNC_DRIVERS = {
+	"sqlite": "sqlite+aiosqlite",
+	"postgresql": "postgresql+asyncpg",
+	"mysql": "mysql+aiomysql",
+}
+
+# Per-table column counts in one round-trip, used to fingerprint the
+# schema for the on-disk cache. Other dialects fall back to reflection.
+COLUMN_COUNT_SQL = {
+	"sqlite": (
+		"SELECT m.name, COUNT(p.name) FROM sqlite_master AS m "
+		"JOIN pragma_table_info(m.name) AS p "
+		"WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%' GROUP BY m.name"
+	),
+	"postgresql": (
+		"SELECT table_name, COUNT(*) FROM information_schema.columns "
+		"WHERE table_schema = current_schema() GROUP BY table_name"
+	),
+	"mysql": (
+		"SELECT table_name, COUNT(*) FROM information_schema.columns "
+		"WHERE table_schema = DATABASE() GROUP BY table_name"
+	),
+}
+
+SQLITE_CONNECT_PRAGMAS = (
+	"PRAGMA synchronous=NORMAL",
+	"PRAGMA cache_size=-64000",
+	"PRAGMA temp_store=MEMORY",
+)
+
+
+class UnsafeQueryError(ValueError):
+	"""Raised when SQL fails the read-only check."""
 
 
 def build_sqlite_uri_from_path(path: str) -> str:
@@ -35,10 +84,134 @@ def is_read_only_sql(sql: str) -> bool:
 
 	This is a simple heuristic used as an extra guardrail. The main
 	enforcement should also live in the LLM prompting and higher layers.
+	Keywords are matched as whole words, so identifiers such as
+	``deleted_at`` are not rejected.
 	"""
 
-	normalized = " ".join(sql.strip().upper().split())
-	return not any(keyword in normalized for keyword in READ_ONLY_BLOCKLIST)
+	return _BLOCKLIST_RE.search(sql) is None
+
+
+def _sqlite_wal_enabled() -> bool:
+	"""Return True if ``QUERYAI_SQLITE_WAL`` opts SQLite files into WAL mode."""
+
+	return os.getenv("QUERYAI_SQLITE_WAL", "0").strip().lower() in ("1", "true", "yes")
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+	"""Tune each new SQLite connection (per-connection settings only)."""
+
+	cursor = dbapi_connection.cursor()
+	try:
+		for pragma in SQLITE_CONNECT_PRAGMAS:
+			cursor.execute(pragma)
+	finally:
+		cursor.close()
+
+
+def _enable_sqlite_wal(dbapi_connection, connection_record) -> None:
+	"""Switch the database file to WAL mode.
+
+	Unlike the other PRAGMAs this is persistent: it rewrites the file
+	header and adds ``-wal``/``-shm`` sidecars, so it is opt-in.
+	"""
+
+	cursor = dbapi_connection.cursor()
+	try:
+		cursor.execute("PRAGMA journal_mode=WAL")
+	finally:
+		cursor.close()
+
+
+def create_engine_for_uri(uri: str) -> Engine:
+	"""Create a SQLAlchemy engine with pool settings suited to the backend.
+
+	SQLite connections may be shared across Streamlit threads and get
+	cache PRAGMAs, plus WAL mode when ``QUERYAI_SQLITE_WAL`` is set (it
+	modifies the file, so reads alone never enable it); in-memory
+	databases use a single StaticPool
+	connection so every checkout sees the same data. Server databases get
+	a sized QueuePool with pre-ping and periodic recycling
+	(``DB_POOL_SIZE`` / ``DB_MAX_OVERFLOW`` override the defaults).
+	"""
+
+	url = make_url(uri)
+	if url.get_backend_name() == "sqlite":
+		kwargs: dict[str, Any] = {"connect_args": {"check_same_thread": False}}
+		if url.database in (None, "", ":memory:"):
+			kwargs["poolclass"] = StaticPool
+		engine = create_engine(uri, future=True, **kwargs)
+		event.listen(engine, "connect", _apply_sqlite_pragmas)
+		if _sqlite_wal_enabled() and "poolclass" not in kwargs:
+			event.listen(engine, "connect", _enable_sqlite_wal)
+		return engine
+
+	return create_engine(
+		uri,
+		future=True,
+		pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+		max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+		pool_pre_ping=True,
+		pool_recycle=1800,
+	)
+
+
+def to_async_uri(uri: str) -> str:
+	"""Rewrite a SQLAlchemy URI to use the asyncio driver for its backend.
+
+	``sqlite:///x.db`` becomes ``sqlite+aiosqlite:///x.db`` and
+	``postgresql+psycopg2://...`` becomes ``postgresql+asyncpg://...``.
+	asyncpg does not understand libpq's ``sslmode``, so it is translated
+	to ``ssl`` (same modes), and ``channel_binding`` (which asyncpg
+	cannot configure) is dropped; Neon-style URIs then connect as-is.
+	URIs for unknown backends are returned unchanged.
+	"""
+
+	url = make_url(uri)
+	backend = url.get_backend_name()
+	driver = ASYNC_DRIVERS.get(backend)
+	if driver is None:
+		return uri
+	url = url.set(drivername=driver)
+	if backend == "postgresql":
+		query = dict(url.query)
+		sslmode = query.pop("sslmode", None)
+		query.pop("channel_binding", None)
+		if sslmode is not None:
+			query.setdefault("ssl", sslmode)
+		url = url.set(query=query)
+	return url.render_as_string(hide_password=False)
+
+
+def _summarize_schema(bind) -> str:
+	"""Build the schema summary text from a connection or engine.
+
+	On SQLAlchemy 2.x ``get_multi_columns`` reflects every table in one
+	batch (a single catalog query on PostgreSQL) instead of one
+	``get_columns`` round-trip per table.
+	"""
+
+	inspector = inspect(bind)
+
+	if hasattr(inspector, "get_multi_columns"):
+		multi = inspector.get_multi_columns()
+		tables = sorted(((key[1], columns) for key, columns in multi.items()), key=lambda item: item[0])
+	else:  # SQLAlchemy 1.4
+		tables = [(name, inspector.get_columns(name)) for name in inspector.get_table_names()]
+
+	return "\n".join(
+		f"Table {table_name}: " + ", ".join(f"{c['name']} ({c.get('type')})" for c in columns)
+		for table_name, columns in tables
+	)
+
+
+def _read_dataframe(conn, sql: str, params: Optional[dict[str, Any]] = None) -> pd.DataFrame:
+	"""Execute SQL on a sync connection and build the DataFrame column-wise.
+
+	``pd.read_sql_query`` fills columns straight from the cursor instead of
+	materializing a list of Row tuples and copying it into a frame.
+	"""
+
+	return pd.read_sql_query(text(sql), conn, params=params or {})
 
 
 @dataclass
@@ -58,19 +231,69 @@ class QueryResult:
 
 
 class DatabaseManager:
-	"""Lightweight wrapper around SQLAlchemy for read-only queries."""
+	"""Lightweight wrapper around SQLAlchemy for read-only queries.
+
+	The schema summary is memoized after the first introspection. Pass
+	``schema_cache_ttl`` (seconds) to have it refreshed periodically, or
+	call ``invalidate_schema()`` after a migration. With
+	``schema_cache_dir`` set, the summary is also persisted to disk so a
+	fresh process can skip introspection (see
+	``load_or_build_schema_cache``).
+	"""
 
-	def __init__(self, uri: str) -> None:
+	def __init__(
+		self,
+		uri: str,
+		schema_cache_ttl: Optional[float] = None,
+		schema_cache_dir: Optional[Path] = None,
+	) -> None:
 		self._uri = uri
 		self._engine: Optional[Engine] = None
+		self._schema_cache_ttl = schema_cache_ttl
+		self._schema_cache_dir = schema_cache_dir
 		self._schema_summary_cache: Optional[str] = None
+		self._schema_cache_ts: float = 0.0
+		self._dialect_name: Optional[str] = None
+		self._schema_disk_stale = False
 
 	@property
 	def engine(self) -> Engine:
 		if self._engine is None:
-			self._engine = create_engine(self._uri, future=True)
+			self._engine = create_engine_for_uri(self._uri)
 		return self._engine
 
+	def dispose(self) -> None:
+		"""Close pooled connections and drop the engine (recreated on next use)."""
+
+		if self._engine is not None:
+			self._engine.dispose()
+			self._engine = None
+
+	@property
+	def dialect_name(self) -> str:
+		"""Return the SQLAlchemy dialect name (e.g. ``sqlite``, ``postgresql``)."""
+
+		if self._dialect_name is None:
+			self._dialect_name = getattr(self.engine.dialect, "name", "sqlite")
+		return self._dialect_name
+
+	def invalidate_schema(self) -> None:
+		"""Drop the cached schema summary so the next call re-introspects.
+
+		The on-disk copy (if any) is bypassed and rewritten on that call.
+		"""
+
+		self._schema_summary_cache = None
+		self._schema_cache_ts = 0.0
+		self._schema_disk_stale = True
+
+	def _schema_cache_valid(self) -> bool:
+		if self._schema_summary_cache is None:
+			return False
+		if self._schema_cache_ttl is None:
+			return True
+		return (time.monotonic() - self._schema_cache_ts) < self._schema_cache_ttl
+
 	def test_connection(self) -> bool:
 		"""Return True if a simple `SELECT 1` succeeds."""
 
@@ -84,35 +307,158 @@ class DatabaseManager:
 	def get_schema_summary(self) -> str:
 		"""Return a simple human-readable schema summary for the DB.
 
-		This will be fed into the LLM as context during Text-to-SQL.
+		This will be fed into the LLM as context during Text-to-SQL. The
+		result is cached; see ``invalidate_schema()``.
 		"""
 
-		if self._schema_summary_cache is not None:
+		if self._schema_cache_valid():
 			return self._schema_summary_cache
 
-		inspector = inspect(self.engine)
-		lines: list[str] = []
+		if self._schema_cache_dir is not None:
+			# The disk copy only serves cold starts; an invalidated or
+			# TTL-expired summary is always re-introspected.
+			refresh = self._schema_disk_stale or self._schema_summary_cache is not None
+			summary = self.load_or_build_schema_cache(self._schema_cache_dir, refresh=refresh)
+			self._schema_disk_stale = False
+			return summary
 
-		for table_name in inspector.get_table_names():
-			columns = inspector.get_columns(table_name)
-			col_desc = ", ".join(f"{c['name']} ({c.get('type')})" for c in columns)
-			lines.append(f"Table {table_name}: {col_desc}")
+		return self._set_schema_summary(_summarize_schema(self.engine))
 
-		self._schema_summary_cache = "\n".join(lines)
-		return self._schema_summary_cache
+	def _set_schema_summary(self, summary: str) -> str:
+		self._schema_summary_cache = summary
+		self._schema_cache_ts = time.monotonic()
+		return summary
+
+	def _schema_fingerprint(self) -> str:
+		"""Cheap fingerprint of the schema: table names plus column counts.
+
+		Uses a single catalog query where the dialect has one in
+		``COLUMN_COUNT_SQL``; otherwise falls back to reflecting columns.
+		"""
+
+		count_sql = COLUMN_COUNT_SQL.get(self.dialect_name)
+		if count_sql is not None:
+			with self.engine.connect() as conn:
+				counts = {str(name): int(count) for name, count in conn.execute(text(count_sql))}
+		else:
+			inspector = inspect(self.engine)
+			counts = {name: len(inspector.get_columns(name)) for name in inspector.get_table_names()}
+
+		key = "|".join(f"{name}:{counts[name]}" for name in sorted(counts))
+		return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+	def load_or_build_schema_cache(self, cache_dir: Path, refresh: bool = False) -> str:
+		"""Return the schema summary from an on-disk cache, rebuilding if stale.
+
+		The cache file is keyed by a hash of the DB URI and stores a
+		fingerprint of the table names and their column counts. A stored
+		summary is reused when the fingerprint still matches, which costs a
+		single catalog query instead of full column introspection.
+		``refresh=True`` always rebuilds and rewrites the file.
+		"""
+
+		cache_dir = Path(cache_dir)
+		uri_hash = hashlib.sha1(self._uri.encode("utf-8")).hexdigest()
+		cache_path = cache_dir / f"{uri_hash}.json"
+		fingerprint = self._schema_fingerprint()
+
+		if not refresh and cache_path.exists():
+			try:
+				payload = json.loads(cache_path.read_text(encoding="utf-8"))
+			except (OSError, ValueError):
+				payload = {}
+			if payload.get("fingerprint") == fingerprint and isinstance(payload.get("summary"), str):
+				return self._set_schema_summary(payload["summary"])
+
+		summary = self._set_schema_summary(_summarize_schema(self.engine))
+		try:
+			cache_dir.mkdir(parents=True, exist_ok=True)
+			cache_path.write_text(
+				json.dumps({"fingerprint": fingerprint, "summary": summary}),
+				encoding="utf-8",
+			)
+		except OSError:
+			# A read-only filesystem only loses the cold-start speedup
+			pass
+		return summary
 
 	def run_read_only_query(self, sql: str, params: Optional[dict[str, Any]] = None) -> QueryResult:
 		"""Execute a read-only SQL statement and return a QueryResult.
 
-		Raises ValueError if the SQL is deemed unsafe (non-read-only).
+		Raises UnsafeQueryError (a ValueError) if the SQL is deemed unsafe
+		(non-read-only).
+		"""
+
+		with self.engine.connect() as conn:
+			return self.run_read_only_query_conn(conn, sql, params)
+
+	def run_read_only_query_conn(
+		self,
+		conn: Connection,
+		sql: str,
+		params: Optional[dict[str, Any]] = None,
+	) -> QueryResult:
+		"""Like ``run_read_only_query`` but on an already checked-out connection.
+
+		Lets callers issue several attempts with a single pool checkout. The
+		autobegun transaction is always rolled back afterwards, so a failed
+		statement does not poison the connection (PostgreSQL rejects
+		everything until the transaction ends) and a successful one does not
+		leave it idle in transaction or pin a SQLite read snapshot.
 		"""
 
 		if not is_read_only_sql(sql):
-			raise ValueError("Only read-only SELECT-style queries are allowed.")
+			raise UnsafeQueryError("Only read-only SELECT-style queries are allowed.")
 
-		with self.engine.connect() as conn:
-			result = conn.execute(text(sql), params or {})
-			rows = result.fetchall()
-			dataframe = pd.DataFrame(rows, columns=result.keys())
-			return QueryResult(dataframe=dataframe, rowcount=len(rows))
+		try:
+			dataframe = _read_dataframe(conn, sql, params)
+		finally:
+			conn.rollback()
+		return QueryResult(dataframe=dataframe, rowcount=len(dataframe.index))
+
+
+class AsyncDatabaseManager:
+	"""Asyncio query runner used by ``TextToSQLAgent.aanswer_question``.
+
+	Only query execution is async; schema introspection stays on the sync
+	DatabaseManager. The URI is rewritten with ``to_async_uri`` so the
+	matching async driver (aiosqlite, asyncpg, aiomysql) must be installed,
+	along with ``sqlalchemy[asyncio]``. The engine's pool is bound to the
+	event loop it is first used on.
+	"""
+
+	def __init__(self, uri: str) -> None:
+		self._uri = to_async_uri(uri)
+		self._engine: Optional["AsyncEngine"] = None
+
+	@property
+	def engine(self) -> "AsyncEngine":
+		if self._engine is None:
+			# Imported lazily: sqlalchemy.ext.asyncio requires greenlet
+			from sqlalchemy.ext.asyncio import create_async_engine
+
+			self._engine = create_async_engine(self._uri)
+		return self._engine
+
+	async def dispose(self) -> None:
+		"""Close all pooled connections."""
+
+		if self._engine is not None:
+			await self._engine.dispose()
 
+	async def run_read_only_query_conn(
+		self,
+		conn: "AsyncConnection",
+		sql: str,
+		params: Optional[dict[str, Any]] = None,
+	) -> QueryResult:
+		"""Async counterpart of ``DatabaseManager.run_read_only_query_conn``."""
+
+		if not is_read_only_sql(sql):
+			raise UnsafeQueryError("Only read-only SELECT-style queries are allowed.")
+
+		try:
+			dataframe = await conn.run_sync(_read_dataframe, sql, params)
+		finally:
+			await conn.rollback()
+		return QueryResult(dataframe=dataframe, rowcount=len(dataframe.index))
@@ -12,12 +12,21 @@ with a free or local model and later swap providers.
 
 from __future__ import annotations
 
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
 from dataclasses import dataclass, field
-from typing import Optional
+from functools import lru_cache
+from typing import Any, Iterator, Optional
 
+from langchain_core.caches import BaseCache
 from langchain_core.language_models import BaseLanguageModel
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel, Field
 
 
 @dataclass
@@ -25,6 +34,7 @@ class UsageStats:
 	"""Tracks API call and token usage for a single user request."""
 
 	api_calls: int = 0
+	cached_calls: int = 0  # served from the LLM response cache, not billed
 	input_tokens: int = 0
 	output_tokens: int = 0
 	details: list = field(default_factory=list)  # per-call breakdown
@@ -33,30 +43,86 @@ class UsageStats:
 	def total_tokens(self) -> int:
 		return self.input_tokens + self.output_tokens
 
-	def record(self, label: str, input_tok: int, output_tok: int) -> None:
-		self.api_calls += 1
-		self.input_tokens += input_tok
-		self.output_tokens += output_tok
+	def record(self, label: str, input_tok: int, output_tok: int, cached: bool = False) -> None:
+		if cached:
+			# Replayed metadata describes the original call; nothing was spent
+			self.cached_calls += 1
+			input_tok = output_tok = 0
+		else:
+			self.api_calls += 1
+			self.input_tokens += input_tok
+			self.output_tokens += output_tok
 		self.details.append({
 			"call": label,
 			"input_tokens": input_tok,
 			"output_tokens": output_tok,
+			"cached": cached,
 		})
 
-BASE_TEXT_TO_SQL_SYSTEM_PROMPT = """You are an expert data analyst and SQL engineer.
+
+# Set to a fresh list before each LLM call; CacheHitTracker appends to it
+# when that call is answered from the response cache.
+_cache_hits: ContextVar[Optional[list]] = ContextVar("queryai_llm_cache_hits", default=None)
+
+
+def _track_cache_hits() -> list:
+	"""Start tracking cache hits for the next LLM call in this context."""
+	hits: list = []
+	_cache_hits.set(hits)
+	return hits
+
+
+class CacheHitTracker(BaseCache):
+	"""LLM response cache wrapper that reports hits to ``LLMEngine``.
+
+	LangChain replays the cached ``response_metadata`` on a hit, so token
+	usage alone cannot tell a cached response from a billed one.
+	"""
+
+	def __init__(self, cache: BaseCache) -> None:
+		self.cache = cache
+
+	@staticmethod
+	def _mark(value):
+		hits = _cache_hits.get()
+		if value is not None and hits is not None:
+			hits.append(True)
+		return value
+
+	def lookup(self, prompt: str, llm_string: str):
+		return self._mark(self.cache.lookup(prompt, llm_string))
+
+	async def alookup(self, prompt: str, llm_string: str):
+		return self._mark(await self.cache.alookup(prompt, llm_string))
+
+	def update(self, prompt: str, llm_string: str, return_val) -> None:
+		self.cache.update(prompt, llm_string, return_val)
+
+	async def aupdate(self, prompt: str, llm_string: str, return_val) -> None:
+		await self.cache.aupdate(prompt, llm_string, return_val)
+
+	def clear(self, **kwargs: Any) -> None:
+		self.cache.clear(**kwargs)
+
+	async def aclear(self, **kwargs: Any) -> None:
+		await self.cache.aclear(**kwargs)
+
+# Shared by the plain and structured (plan) SQL generation prompts
+SQL_GENERATION_RULES = """You are an expert data analyst and SQL engineer.
 
 You are connected to a READ-ONLY SQL database. You must:
 - ONLY generate valid SQL for the target dialect (assume {dialect} by default).
 - NEVER generate INSERT, UPDATE, DELETE, DROP, ALTER, or TRUNCATE.
 - Prefer simple, single-statement queries.
 - Use identifiers exactly as they appear in the schema.
-- Use identifiers exactly as they appear in the schema.
 - For PostgreSQL, if a table/column contains uppercase letters (e.g. driverId), always use double quotes and preserve case.
 - In dotted references with aliases, quote the column part too: a."driverId", a."routeId", d."id".
 - Never emit unquoted camelCase identifiers in PostgreSQL.
 - If users ask about "parcels behind" / "behind parcels" / "how many parcels ... behind", map that metric to "Assignment"."parcelsBehind" when present in schema.
 - For driver-specific parcel-behind questions, join "Assignment" and "Driver" on "Assignment"."driverId" = "Driver"."id" and filter by "Driver"."name".
+"""
 
+BASE_TEXT_TO_SQL_SYSTEM_PROMPT = SQL_GENERATION_RULES + """
 The database schema is:
 {schema_summary}
 
@@ -67,6 +133,24 @@ Respond with ONLY the SQL query, no explanation, no markdown.
 """
 
 
+SQL_PLAN_PROMPT = SQL_GENERATION_RULES + """
+The database schema is:
+{schema_summary}
+
+User question:
+{question}
+
+Return:
+- sql: the SQL query only, no explanation, no markdown.
+- answer_template: a one-sentence answer to the question that can be filled
+  in without seeing the data, using the placeholders {{rowcount}} (number of
+  rows returned), {{columns}} (comma-separated column names) and {{value}}
+  (the first cell of the result).
+- needs_summary: true if a good answer requires reading the returned rows
+  (comparisons, rankings, trends); false if the template is sufficient.
+"""
+
+
 ANSWER_GENERATION_PROMPT = """You are a helpful data analyst. The user asked:
 
 "{question}"
@@ -108,6 +192,81 @@ Again, respond with ONLY the SQL query, no explanation, no markdown.
 """
 
 
+# Templates are parsed once at import and shared by every LLMEngine
+_BASE_PROMPT = ChatPromptTemplate.from_template(BASE_TEXT_TO_SQL_SYSTEM_PROMPT)
+_PLAN_PROMPT = ChatPromptTemplate.from_template(SQL_PLAN_PROMPT)
+_ERROR_PROMPT = ChatPromptTemplate.from_template(ERROR_CORRECTION_PROMPT)
+_ANSWER_PROMPT = ChatPromptTemplate.from_template(ANSWER_GENERATION_PROMPT)
+
+
+class SqlPlan(BaseModel):
+	"""Structured output for the fused SQL + answer-template call."""
+
+	sql: str = Field(description="A single read-only SQL query answering the question.")
+	answer_template: str = Field(
+		description="One-sentence answer using {rowcount}, {columns} and {value} placeholders.",
+	)
+	needs_summary: bool = Field(
+		default=True,
+		description="True if the answer requires an LLM summary of the result rows.",
+	)
+
+
+# Max entries per in-process LLM response cache (see LLMEngine)
+LLM_RESPONSE_CACHE_MAX_ENTRIES = 256
+
+_CAMEL_BOUNDARY_RE = re.compile(r"([a-z0-9])([A-Z])")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_COLUMN_TYPE_RE = re.compile(r"\([^)]*\)")
+
+
+def _tokenize(text: str) -> set[str]:
+	"""Lower-case word tokens with camelCase split and plural 's' dropped."""
+	words = _WORD_RE.findall(_CAMEL_BOUNDARY_RE.sub(r"\1 \2", text).lower())
+	return {w[:-1] if len(w) > 3 and w.endswith("s") else w for w in words}
+
+
+@lru_cache(maxsize=8)
+def _split_schema_entries(schema_summary: str) -> tuple[tuple[str, frozenset[str], frozenset[str]], ...]:
+	"""Split a schema summary into (line, table tokens, column tokens) entries.
+
+	Cached so repeated questions against the same schema only parse once.
+	"""
+	entries = []
+	for line in schema_summary.splitlines():
+		if not line.strip():
+			continue
+		table_part, _, column_part = line.partition(":")
+		table_tokens = _tokenize(table_part.removeprefix("Table "))
+		column_tokens = _tokenize(_COLUMN_TYPE_RE.sub(" ", column_part))
+		entries.append((line, frozenset(table_tokens), frozenset(column_tokens)))
+	return tuple(entries)
+
+
+def _select_relevant_schema(question: str, schema_summary: str, k: int) -> str:
+	"""Keep only the ``k`` tables most relevant to the question.
+
+	Tables are scored by token overlap with the question, with table-name
+	hits weighted above column hits. The original table order is kept.
+	The full summary is returned when it already fits in ``k`` tables or
+	when nothing in the question matches.
+	"""
+	entries = _split_schema_entries(schema_summary)
+	if k <= 0 or len(entries) <= k:
+		return schema_summary
+
+	question_tokens = _tokenize(question)
+	scores = [
+		2 * len(question_tokens & table_tokens) + len(question_tokens & column_tokens)
+		for _, table_tokens, column_tokens in entries
+	]
+	if not any(scores):
+		return schema_summary
+
+	ranked = sorted(range(len(entries)), key=lambda i: scores[i], reverse=True)[:k]
+	return "\n".join(entries[i][0] for i in sorted(ranked))
+
+
 @dataclass
 class SQLGenerationResult:
 	"""Container for SQL generation attempts."""
@@ -117,44 +276,146 @@ class SQLGenerationResult:
 
 
 class LLMEngine:
-	"""Thin wrapper over a LangChain LLM for Text-to-SQL tasks."""
+	"""Thin wrapper over a LangChain LLM for Text-to-SQL tasks.
+
+	Initial SQL generation only sees the ``schema_top_k`` tables most
+	relevant to the question (``SCHEMA_TOPK`` env var, default 10) to keep
+	prompts small on wide schemas. Error correction gets the full schema.
+
+	Initial SQL, plans and answers are memoized in small in-process LRU
+	caches keyed by their inputs, so a repeated call skips prompt rendering
+	and the chain entirely and records no usage.
+
+	One engine may serve several sessions at once (e.g. a cached Streamlit
+	agent), so ``usage`` is held per context (thread / asyncio task) rather
+	than on the instance, and the LRU caches are guarded by a lock.
+	"""
 
-	def __init__(self, llm: BaseLanguageModel) -> None:
+	def __init__(self, llm: BaseLanguageModel, schema_top_k: Optional[int] = None) -> None:
 		self._llm = llm
-		self.usage = UsageStats()
+		self._usage_var: ContextVar[Optional[UsageStats]] = ContextVar(
+			f"queryai_usage_{id(self)}",
+			default=None,
+		)
+		if schema_top_k is None:
+			schema_top_k = int(os.getenv("SCHEMA_TOPK", "10"))
+		self._schema_top_k = schema_top_k
 
-		base_prompt = ChatPromptTemplate.from_template(BASE_TEXT_TO_SQL_SYSTEM_PROMPT)
-		error_prompt = ChatPromptTemplate.from_template(ERROR_CORRECTION_PROMPT)
-		answer_prompt = ChatPromptTemplate.from_template(ANSWER_GENERATION_PROMPT)
+		self._plan_chain = None
+		self._plan_supported = True
 
 		# Keep raw LLM chains (no StrOutputParser) so we can read token metadata
-		self._base_chain = base_prompt | self._llm
-		self._error_chain = error_prompt | self._llm
-		self._answer_chain = answer_prompt | self._llm
+		self._base_chain = _BASE_PROMPT | self._llm
+		self._error_chain = _ERROR_PROMPT | self._llm
+		self._answer_chain = _ANSWER_PROMPT | self._llm
+
+		self._sql_cache: OrderedDict[tuple, str] = OrderedDict()
+		self._plan_cache: OrderedDict[tuple, SqlPlan] = OrderedDict()
+		self._answer_cache: OrderedDict[tuple, str] = OrderedDict()
+		self._cache_lock = threading.Lock()
+
+	@property
+	def usage(self) -> UsageStats:
+		"""Usage counters for the current request (thread / asyncio task)."""
+		usage = self._usage_var.get()
+		if usage is None:
+			usage = UsageStats()
+			self._usage_var.set(usage)
+		return usage
 
 	def reset_usage(self) -> None:
 		"""Reset counters at the start of each user question."""
-		self.usage = UsageStats()
-
-	def _invoke_and_track(self, chain, payload: dict, label: str) -> str:
-		"""Invoke a chain, extract token usage from the response metadata."""
-		result = chain.invoke(payload)
+		self._usage_var.set(UsageStats())
 
+	def _record_usage(self, message, label: str, cached: bool = False) -> None:
+		"""Extract token usage from an LLM message and record it."""
 		# LangChain AIMessage carries usage in response_metadata
 		input_tok = 0
 		output_tok = 0
-		meta = getattr(result, "response_metadata", {}) or {}
+		meta = getattr(message, "response_metadata", {}) or {}
 		token_usage = meta.get("token_usage") or meta.get("usage") or {}
 		if token_usage:
 			input_tok = token_usage.get("prompt_tokens", 0) or token_usage.get("input_tokens", 0)
 			output_tok = token_usage.get("completion_tokens", 0) or token_usage.get("output_tokens", 0)
 
-		self.usage.record(label, input_tok, output_tok)
+		self.usage.record(label, input_tok, output_tok, cached=cached)
 
-		# Extract text content
-		text = result.content if hasattr(result, "content") else str(result)
+	@staticmethod
+	def _message_text(message) -> str:
+		"""Extract stripped text content from an LLM message."""
+		text = message.content if hasattr(message, "content") else str(message)
 		return text.strip()
 
+	def _invoke_and_track(self, chain, payload: dict, label: str) -> str:
+		"""Invoke a chain, extract token usage from the response metadata."""
+		hits = _track_cache_hits()
+		result = chain.invoke(payload)
+		self._record_usage(result, label, cached=bool(hits))
+		return self._message_text(result)
+
+	async def _ainvoke_and_track(self, chain, payload: dict, label: str) -> str:
+		"""Async counterpart of ``_invoke_and_track``."""
+		hits = _track_cache_hits()
+		result = await chain.ainvoke(payload)
+		self._record_usage(result, label, cached=bool(hits))
+		return self._message_text(result)
+
+	def _get_plan_chain(self):
+		"""Build the structured-output plan chain, or None if unsupported."""
+		if not self._plan_supported:
+			return None
+		if self._plan_chain is None:
+			try:
+				structured = self._llm.with_structured_output(SqlPlan, include_raw=True)
+			except NotImplementedError:
+				self._plan_supported = False
+				return None
+			self._plan_chain = _PLAN_PROMPT | structured
+		return self._plan_chain
+
+	def _plan_from_result(self, result: dict, cached: bool = False) -> Optional[SqlPlan]:
+		"""Record usage for a structured plan call and validate its output."""
+		self._record_usage(result.get("raw"), "generate_sql_plan", cached=cached)
+
+		plan = result.get("parsed")
+		if result.get("parsing_error") is not None or not isinstance(plan, SqlPlan):
+			return None
+		plan.sql = plan.sql.strip()
+		return plan if plan.sql else None
+
+	@staticmethod
+	def _digest(text: str) -> str:
+		return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+	def _cache_get(self, cache: OrderedDict, key: tuple):
+		"""Return a cached value and mark it most recently used, or None."""
+		with self._cache_lock:
+			value = cache.get(key)
+			if value is not None:
+				cache.move_to_end(key)
+			return value
+
+	def _cache_put(self, cache: OrderedDict, key: tuple, value) -> None:
+		with self._cache_lock:
+			cache[key] = value
+			cache.move_to_end(key)
+			while len(cache) > LLM_RESPONSE_CACHE_MAX_ENTRIES:
+				cache.popitem(last=False)
+
+	def _sql_cache_key(self, question: str, schema_summary: str, dialect: str) -> tuple:
+		return (question, self._digest(schema_summary), dialect)
+
+	def _answer_cache_key(self, question: str, sql: str, results: str) -> tuple:
+		return (question, sql, self._digest(results))
+
+	def _sql_payload(self, question: str, schema_summary: str, dialect: str) -> dict:
+		"""Prompt inputs for initial SQL generation with a pruned schema."""
+		return {
+			"question": question,
+			"schema_summary": _select_relevant_schema(question, schema_summary, self._schema_top_k),
+			"dialect": dialect,
+		}
+
 	def generate_sql(
 		self,
 		question: str,
@@ -162,11 +423,111 @@ class LLMEngine:
 		dialect: str = "sqlite",
 	) -> str:
 		"""Generate an initial SQL query from natural language and schema."""
-		return self._invoke_and_track(
+		key = self._sql_cache_key(question, schema_summary, dialect)
+		cached = self._cache_get(self._sql_cache, key)
+		if cached is not None:
+			return cached
+		sql = self._invoke_and_track(
+			self._base_chain,
+			self._sql_payload(question, schema_summary, dialect),
+			label="generate_sql",
+		)
+		self._cache_put(self._sql_cache, key, sql)
+		return sql
+
+	async def agenerate_sql(
+		self,
+		question: str,
+		schema_summary: str,
+		dialect: str = "sqlite",
+	) -> str:
+		"""Async counterpart of ``generate_sql``."""
+		key = self._sql_cache_key(question, schema_summary, dialect)
+		cached = self._cache_get(self._sql_cache, key)
+		if cached is not None:
+			return cached
+		sql = await self._ainvoke_and_track(
 			self._base_chain,
-			{"question": question, "schema_summary": schema_summary, "dialect": dialect},
+			self._sql_payload(question, schema_summary, dialect),
 			label="generate_sql",
 		)
+		self._cache_put(self._sql_cache, key, sql)
+		return sql
+
+	@staticmethod
+	def _is_plan_unsupported_error(exc: Exception) -> bool:
+		"""Return True if ``exc`` means structured output is not supported.
+
+		Matches ``NotImplementedError`` and provider bad-request errors
+		(HTTP 400) by duck typing, so no provider SDK is imported here.
+		"""
+		if isinstance(exc, NotImplementedError):
+			return True
+		return type(exc).__name__ == "BadRequestError" or getattr(exc, "status_code", None) == 400
+
+	def generate_sql_and_answer_plan(
+		self,
+		question: str,
+		schema_summary: str,
+		dialect: str = "sqlite",
+	) -> Optional[SqlPlan]:
+		"""Generate SQL and an answer template in a single structured call.
+
+		Returns None if the model does not support structured output, the
+		provider rejects the request (e.g. no ``response_format`` support) or
+		the response could not be parsed; callers should then fall back to
+		``generate_sql``. Only a rejected request disables the fused call for
+		the lifetime of this engine; transient errors (timeouts, rate limits)
+		skip it for this call alone.
+		"""
+		key = self._sql_cache_key(question, schema_summary, dialect)
+		cached = self._cache_get(self._plan_cache, key)
+		if cached is not None:
+			return cached.model_copy()
+		chain = self._get_plan_chain()
+		if chain is None:
+			return None
+		hits = _track_cache_hits()
+		try:
+			result = chain.invoke(
+				self._sql_payload(question, schema_summary, dialect),
+			)
+		except Exception as exc:  # noqa: BLE001 - fall back to generate_sql
+			if self._is_plan_unsupported_error(exc):
+				self._plan_supported = False
+			return None
+		plan = self._plan_from_result(result, cached=bool(hits))
+		if plan is not None:
+			self._cache_put(self._plan_cache, key, plan.model_copy())
+		return plan
+
+	async def agenerate_sql_and_answer_plan(
+		self,
+		question: str,
+		schema_summary: str,
+		dialect: str = "sqlite",
+	) -> Optional[SqlPlan]:
+		"""Async counterpart of ``generate_sql_and_answer_plan``."""
+		key = self._sql_cache_key(question, schema_summary, dialect)
+		cached = self._cache_get(self._plan_cache, key)
+		if cached is not None:
+			return cached.model_copy()
+		chain = self._get_plan_chain()
+		if chain is None:
+			return None
+		hits = _track_cache_hits()
+		try:
+			result = await chain.ainvoke(
+				self._sql_payload(question, schema_summary, dialect),
+			)
+		except Exception as exc:  # noqa: BLE001 - fall back to generate_sql
+			if self._is_plan_unsupported_error(exc):
+				self._plan_supported = False
+			return None
+		plan = self._plan_from_result(result, cached=bool(hits))
+		if plan is not None:
+			self._cache_put(self._plan_cache, key, plan.model_copy())
+		return plan
 
 	def refine_sql_on_error(
 		self,
@@ -189,6 +550,27 @@ class LLMEngine:
 			label="refine_sql",
 		)
 
+	async def arefine_sql_on_error(
+		self,
+		question: str,
+		schema_summary: str,
+		previous_sql: str,
+		error_message: str,
+		dialect: str = "sqlite",
+	) -> str:
+		"""Async counterpart of ``refine_sql_on_error``."""
+		return await self._ainvoke_and_track(
+			self._error_chain,
+			{
+				"question": question,
+				"schema_summary": schema_summary,
+				"previous_sql": previous_sql,
+				"error_message": error_message,
+				"dialect": dialect,
+			},
+			label="refine_sql",
+		)
+
 	def generate_answer(
 		self,
 		question: str,
@@ -196,9 +578,62 @@ class LLMEngine:
 		results: str,
 	) -> str:
 		"""Generate a natural-language answer from query results."""
-		return self._invoke_and_track(
+		key = self._answer_cache_key(question, sql, results)
+		cached = self._cache_get(self._answer_cache, key)
+		if cached is not None:
+			return cached
+		answer = self._invoke_and_track(
 			self._answer_chain,
 			{"question": question, "sql": sql, "results": results},
 			label="generate_answer",
 		)
+		self._cache_put(self._answer_cache, key, answer)
+		return answer
 
+	async def agenerate_answer(
+		self,
+		question: str,
+		sql: str,
+		results: str,
+	) -> str:
+		"""Async counterpart of ``generate_answer``."""
+		key = self._answer_cache_key(question, sql, results)
+		cached = self._cache_get(self._answer_cache, key)
+		if cached is not None:
+			return cached
+		answer = await self._ainvoke_and_track(
+			self._answer_chain,
+			{"question": question, "sql": sql, "results": results},
+			label="generate_answer",
+		)
+		self._cache_put(self._answer_cache, key, answer)
+		return answer
+
+	def stream_answer(
+		self,
+		question: str,
+		sql: str,
+		results: str,
+	) -> Iterator[str]:
+		"""Yield the natural-language answer incrementally as tokens arrive.
+
+		Usage is recorded and the full text cached once the stream is
+		exhausted; a cached answer is yielded in one piece.
+		"""
+		key = self._answer_cache_key(question, sql, results)
+		cached = self._cache_get(self._answer_cache, key)
+		if cached is not None:
+			yield cached
+			return
+
+		merged = None
+		hits = _track_cache_hits()
+		for chunk in self._answer_chain.stream({"question": question, "sql": sql, "results": results}):
+			merged = chunk if merged is None else merged + chunk
+			text = chunk.content if hasattr(chunk, "content") else str(chunk)
+			if text:
+				yield text
+
+		if merged is not None:
+			self._record_usage(merged, "generate_answer", cached=bool(hits))
+			self._cache_put(self._answer_cache, key, self._message_text(merged))
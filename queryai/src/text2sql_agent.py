@@ -6,12 +6,37 @@ implement a simple agentic reasoning loop with self-correction.
 
 from __future__ import annotations
 
+import asyncio
 import re
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
-from typing import Optional
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional
 
-from .db_manager import DatabaseManager, QueryResult
-from .llm_engine import LLMEngine, UsageStats
+from sqlalchemy.exc import SQLAlchemyError
+
+from .db_manager import AsyncDatabaseManager, DatabaseManager, QueryResult, UnsafeQueryError
+from .llm_engine import LLMEngine, SqlPlan, UsageStats
+
+
+# Missing-table errors across SQLite, PostgreSQL and MySQL. With the schema
+# already in the prompt these mean the model invented a table name.
+_MISSING_TABLE_RE = re.compile(
+	r"no such table|UndefinedTable|relation \"[^\"]+\" does not exist|Table '[^']+' doesn't exist",
+)
+
+
+_PLACEHOLDER_RE = re.compile(r"\{([^{}]*)\}")
+
+# Questions remembered per agent; the agent is shared by every session
+SQL_CACHE_MAX_ENTRIES = 256
+
+
+# Outcomes of a failed attempt (see TextToSQLAgent._on_failure)
+_STOP = "stop"
+_RETRY = "retry"
+_REFINE = "refine"
 
 
 @dataclass
@@ -24,21 +49,38 @@ class AgentResponse:
 	usage: Optional[UsageStats] = None
 
 
+@dataclass
+class _AttemptState:
+	"""Bookkeeping for one question's execute/self-correct loop."""
+
+	sql: str
+	attempts: int = 1
+	last_error: Optional[str] = None
+	missing_table_refined: bool = False
+
+
 class TextToSQLAgent:
-	"""Simple Text-to-SQL agent with up to N self-correction attempts."""
+	"""Simple Text-to-SQL agent with up to N self-correction attempts.
+
+	``aanswer_question`` is the asyncio variant. It queries through
+	``async_db`` when given, otherwise it runs the sync DatabaseManager in
+	a worker thread.
+	"""
 
 	def __init__(
 		self,
 		db: DatabaseManager,
 		llm_engine: LLMEngine,
 		max_retries: int = 3,
+		async_db: Optional[AsyncDatabaseManager] = None,
 	) -> None:
 		self._db = db
+		self._async_db = async_db
 		self._llm = llm_engine
 		self._max_retries = max_retries
-		self._sql_cache: dict[str, str] = {}
-		self._schema_summary: Optional[str] = None
-		self._dialect: Optional[str] = None
+		# Question -> (working SQL, plan whose template describes that SQL), LRU
+		self._sql_cache: OrderedDict[str, tuple[str, Optional[SqlPlan]]] = OrderedDict()
+		self._sql_cache_lock = threading.Lock()
 
 	# ── Local formatting helpers ──────────────────────────────────
 
@@ -82,26 +124,94 @@ class TextToSQLAgent:
 
 		return f"Query returned {len(df)} row(s) across {len(df.columns)} columns."
 
+	def _local_answer(
+		self,
+		question: str,
+		result: QueryResult,
+		plan: Optional[SqlPlan],
+	) -> Optional[str]:
+		"""Return an answer built without the LLM, or None if one is needed.
+
+		Simple results are formatted directly; complex ones use the plan's
+		answer template unless the model asked for a summary.
+		"""
+		if not self._needs_llm_answer(result):
+			return self._format_simple_answer(question, result)
+		if plan is not None and not plan.needs_summary:
+			return self._render_answer_template(plan.answer_template, result)
+		return None
+
+	@staticmethod
+	def _render_answer_template(template: str, result: QueryResult) -> Optional[str]:
+		"""Fill an LLM-provided answer template with local result stats.
+
+		Only the literal ``{rowcount}``, ``{columns}`` and ``{value}``
+		placeholders are substituted (no ``str.format``, so the template
+		cannot trigger attribute or index lookups). Returns None if any
+		other placeholder remains, so the caller can fall back to the LLM.
+		"""
+		df = result.dataframe
+		stats = {
+			"rowcount": result.rowcount,
+			"columns": ", ".join(str(c) for c in df.columns),
+			"value": df.iloc[0, 0] if not df.empty else "",
+		}
+		if any(name not in stats for name in _PLACEHOLDER_RE.findall(template)):
+			return None
+		answer = template
+		for name, value in stats.items():
+			answer = answer.replace("{" + name + "}", str(value))
+		return answer.strip() or None
+
 	@staticmethod
-	def _results_to_text(result: QueryResult, max_rows: int = 200, max_chars: int = 12000) -> str:
-		"""Convert results to a bounded text payload for LLM answer generation."""
+	def _results_to_text(
+		result: QueryResult,
+		max_rows: int = 20,
+		tail_rows: int = 5,
+		max_chars: int = 12000,
+	) -> str:
+		"""Convert results to a bounded text payload for LLM answer generation.
+
+		Small results are sent verbatim. Larger ones are reduced to the row
+		count, the first ``max_rows`` and last ``tail_rows`` rows, and
+		``describe()`` stats for numeric columns, so the prompt size does
+		not grow with the result.
+		"""
 		df = result.dataframe
 		if df.empty:
 			return ""
 
-		preview = df.head(max_rows)
-		text_value = preview.to_string(index=False)
+		if len(df) <= max_rows:
+			text_value = df.to_string(index=False)
+		else:
+			parts = [
+				f"{len(df)} rows total.",
+				f"First {max_rows}:",
+				df.head(max_rows).to_string(index=False),
+				f"Last {tail_rows}:",
+				df.tail(tail_rows).to_string(index=False),
+			]
+			numeric = df.select_dtypes(include="number")
+			if not numeric.columns.empty:
+				parts.extend(["Numeric stats:", numeric.describe().to_string()])
+			text_value = "\n".join(parts)
+
 		if len(text_value) > max_chars:
 			text_value = text_value[:max_chars]
 		return text_value
 
 	def _get_schema_context(self) -> tuple[str, str]:
-		"""Return cached schema summary and SQL dialect for prompt context."""
-		if self._schema_summary is None:
-			self._schema_summary = self._db.get_schema_summary()
-		if self._dialect is None:
-			self._dialect = getattr(self._db.engine.dialect, "name", "sqlite")
-		return self._schema_summary, self._dialect
+		"""Return cached schema summary and SQL dialect for prompt context.
+
+		Both values are memoized by DatabaseManager, so after warmup this
+		never touches the engine; invalidating the schema there is picked up
+		on the next question.
+		"""
+		return self._db.get_schema_summary(), self._db.dialect_name
+
+	@staticmethod
+	def _is_missing_table_error(error_message: str) -> bool:
+		return _MISSING_TABLE_RE.search(error_message) is not None
 
 	@staticmethod
 	def _quote_column_reference(sql: str, qualifier: str, column: str) -> str:
@@ -137,7 +247,98 @@ class TextToSQLAgent:
 
 		return fixed_sql if fixed_sql != sql else None
 
-	# ── Main entry point ──────────────────────────────────────────
+	# ── Shared retry-loop helpers (sync and async paths) ───────────
+
+	def _begin(self, question: str) -> tuple[str, str, str, Optional[tuple[str, Optional[SqlPlan]]]]:
+		"""Return (schema, dialect, cache key, cached (SQL, plan)) for a question."""
+		schema_summary, dialect = self._get_schema_context()
+		cache_key = question.strip().lower()
+		with self._sql_cache_lock:
+			cached = self._sql_cache.get(cache_key)
+			if cached is not None:
+				self._sql_cache.move_to_end(cache_key)
+		return schema_summary, dialect, cache_key, cached
+
+	def _on_failure(self, exc: Exception, state: _AttemptState, dialect: str) -> str:
+		"""Classify a failed attempt and return _STOP, _RETRY or _REFINE.
+
+		_RETRY means ``state.sql`` was fixed deterministically and should be
+		run again as-is; _REFINE means the LLM should correct it.
+		"""
+		state.last_error = str(exc)
+
+		# The model already saw the read-only rules; another
+		# generation will not turn DML into a valid answer.
+		if isinstance(exc, UnsafeQueryError):
+			return _STOP
+
+		# Deterministic Postgres fix: quote hinted mixed-case identifiers.
+		if dialect == "postgresql":
+			auto_fixed = self._auto_quote_from_postgres_error(state.sql, state.last_error)
+			if auto_fixed is not None:
+				state.sql = auto_fixed
+				state.attempts += 1
+				return _RETRY
+
+		if state.attempts >= self._max_retries:
+			return _STOP
+
+		# Hallucinated tables get a single refinement, not the full budget
+		if self._is_missing_table_error(state.last_error):
+			if state.missing_table_refined:
+				return _STOP
+			state.missing_table_refined = True
+
+		return _REFINE
+
+	def _refine_kwargs(self, question: str, schema_summary: str, state: _AttemptState, dialect: str) -> dict:
+		return {
+			"question": question,
+			"schema_summary": schema_summary,
+			"previous_sql": state.sql,
+			"error_message": state.last_error,
+			"dialect": dialect,
+		}
+
+	def _failed_response(self, state: _AttemptState) -> AgentResponse:
+		return AgentResponse(
+			sql=state.sql,
+			result=None,
+			error=state.last_error,
+			attempts=state.attempts,
+			usage=self._llm.usage,
+		)
+
+	def _succeeded(
+		self,
+		question: str,
+		cache_key: str,
+		state: _AttemptState,
+		result: QueryResult,
+		plan: Optional[SqlPlan],
+	) -> Optional[str]:
+		"""Cache the working SQL and return a local answer, or None if the LLM is needed.
+
+		The plan's answer template describes the planned query, so it is
+		dropped once that SQL was refined or auto-quoted.
+		"""
+		if plan is not None and plan.sql != state.sql:
+			plan = None
+		with self._sql_cache_lock:
+			self._sql_cache[cache_key] = (state.sql, plan)
+			self._sql_cache.move_to_end(cache_key)
+			while len(self._sql_cache) > SQL_CACHE_MAX_ENTRIES:
+				self._sql_cache.popitem(last=False)
+		return self._local_answer(question, result, plan)
+
+	# ── Main entry points ─────────────────────────────────────────
+
+	def stream_answer(self, question: str, response: AgentResponse) -> Iterator[str]:
+		"""Stream the LLM answer for a successful response without one."""
+		if response.result is None:
+			return iter(())
+		results_text = self._results_to_text(response.result)
+		return self._llm.stream_answer(question=question, sql=response.sql, results=results_text)
 
 	def run_sql(self, sql: str, question: str | None = None) -> AgentResponse:
 		"""Execute user-provided SQL with the same read-only safeguards.
@@ -184,67 +385,144 @@ class TextToSQLAgent:
 				usage=self._llm.usage,
 			)
 
-	def answer_question(self, question: str) -> AgentResponse:
-		self._llm.reset_usage()
-		schema_summary, dialect = self._get_schema_context()
+	def answer_question(self, question: str, generate_answer: bool = True) -> AgentResponse:
+		"""Generate, execute and self-correct SQL for a question.
 
-		attempts = 0
-		last_error: Optional[str] = None
-		sql: str = ""
-		cache_key = question.strip().lower()
+		With ``generate_answer=False`` results that need an LLM summary come
+		back with ``answer=None`` so the caller can use ``stream_answer``.
+		"""
+		self._llm.reset_usage()
+		schema_summary, dialect, cache_key, cached = self._begin(question)
 
-		# Check cache for repeated questions
-		if cache_key in self._sql_cache:
-			sql = self._sql_cache[cache_key]
+		plan: Optional[SqlPlan] = None
+		if cached is not None:
+			sql, plan = cached
 		else:
-			sql = self._llm.generate_sql(
+			# One structured call yields both the SQL and an answer template
+			plan = self._llm.generate_sql_and_answer_plan(
 				question=question,
 				schema_summary=schema_summary,
 				dialect=dialect,
 			)
-		attempts += 1
-
-		while attempts <= self._max_retries:
-			try:
-				result = self._db.run_read_only_query(sql)
-
-				# Cache successful SQL
-				self._sql_cache[cache_key] = sql
-
-				# Only call LLM for answer if the result is complex
-				if self._needs_llm_answer(result):
-					results_text = self._results_to_text(result)
-					answer = self._llm.generate_answer(
-						question=question,
-						sql=sql,
-						results=results_text,
-					)
-				else:
-					answer = self._format_simple_answer(question, result)
-
-				return AgentResponse(sql=sql, result=result, error=None, attempts=attempts, answer=answer, usage=self._llm.usage)
-			except Exception as exc:  # noqa: BLE001 - top-level agent loop
-				last_error = str(exc)
-
-				# Deterministic Postgres fix: quote hinted mixed-case identifiers.
-				if dialect == "postgresql":
-					auto_fixed = self._auto_quote_from_postgres_error(sql, last_error)
-					if auto_fixed is not None:
-						sql = auto_fixed
-						attempts += 1
-						continue
-
-				if attempts >= self._max_retries:
+			if plan is not None:
+				sql = plan.sql
+			else:
+				sql = self._llm.generate_sql(
+					question=question,
+					schema_summary=schema_summary,
+					dialect=dialect,
+				)
+		state = _AttemptState(sql=sql)
+
+		# One pool checkout serves every attempt for this question
+		try:
+			connection = self._db.engine.connect()
+		except SQLAlchemyError as exc:
+			state.last_error = str(exc)
+			return self._failed_response(state)
+
+		result: Optional[QueryResult] = None
+		with connection as conn:
+			while state.attempts <= self._max_retries:
+				try:
+					result = self._db.run_read_only_query_conn(conn, state.sql)
 					break
+				except Exception as exc:  # noqa: BLE001 - top-level agent loop
+					action = self._on_failure(exc, state, dialect)
+					if action == _STOP:
+						break
+					if action == _REFINE:
+						state.sql = self._llm.refine_sql_on_error(
+							**self._refine_kwargs(question, schema_summary, state, dialect),
+						)
+						state.attempts += 1
+
+		if result is None:
+			return self._failed_response(state)
+
+		# The connection is back in the pool before the (slow) answer call.
+		answer = self._succeeded(question, cache_key, state, result, plan)
+		if answer is None and generate_answer:
+			answer = self._llm.generate_answer(
+				question=question,
+				sql=state.sql,
+				results=self._results_to_text(result),
+			)
 
-				# Ask LLM to refine the SQL using the error message
-				sql = self._llm.refine_sql_on_error(
+		return AgentResponse(sql=state.sql, result=result, error=None, attempts=state.attempts, answer=answer, usage=self._llm.usage)
+
+	@asynccontextmanager
+	async def _aquery_runner(self) -> AsyncIterator[Callable[[str], Awaitable[QueryResult]]]:
+		"""Yield an async ``run(sql)`` bound to one connection for all attempts.
+
+		Uses ``async_db`` when configured, otherwise a sync connection whose
+		calls run in worker threads.
+		"""
+		if self._async_db is not None:
+			async_db = self._async_db
+			async with async_db.engine.connect() as aconn:
+				yield lambda sql: async_db.run_read_only_query_conn(aconn, sql)
+			return
+
+		conn = await asyncio.to_thread(self._db.engine.connect)
+		try:
+			yield lambda sql: asyncio.to_thread(self._db.run_read_only_query_conn, conn, sql)
+		finally:
+			await asyncio.to_thread(conn.close)
+
+	async def aanswer_question(self, question: str, generate_answer: bool = True) -> AgentResponse:
+		"""Async counterpart of ``answer_question`` using ``LLMEngine.a*`` calls."""
+		self._llm.reset_usage()
+		schema_summary, dialect, cache_key, cached = await asyncio.to_thread(self._begin, question)
+
+		plan: Optional[SqlPlan] = None
+		if cached is not None:
+			sql, plan = cached
+		else:
+			plan = await self._llm.agenerate_sql_and_answer_plan(
+				question=question,
+				schema_summary=schema_summary,
+				dialect=dialect,
+			)
+			if plan is not None:
+				sql = plan.sql
+			else:
+				sql = await self._llm.agenerate_sql(
 					question=question,
 					schema_summary=schema_summary,
-					previous_sql=sql,
-					error_message=last_error,
 					dialect=dialect,
 				)
-				attempts += 1
+		state = _AttemptState(sql=sql)
+
+		result: Optional[QueryResult] = None
+		try:
+			async with self._aquery_runner() as run_query:
+				while state.attempts <= self._max_retries:
+					try:
+						result = await run_query(state.sql)
+						break
+					except Exception as exc:  # noqa: BLE001 - top-level agent loop
+						action = self._on_failure(exc, state, dialect)
+						if action == _STOP:
+							break
+						if action == _REFINE:
+							state.sql = await self._llm.arefine_sql_on_error(
+								**self._refine_kwargs(question, schema_summary, state, dialect),
+							)
+							state.attempts += 1
+		except SQLAlchemyError as exc:
+			# Connection could not be checked out
+			state.last_error = str(exc)
+
+		if result is None:
+			return self._failed_response(state)
+
+		answer = self._succeeded(question, cache_key, state, result, plan)
+		if answer is None and generate_answer:
+			answer = await self._llm.agenerate_answer(
+				question=question,
+				sql=state.sql,
+				results=self._results_to_text(result),
+			)
 
-		return AgentResponse(sql=sql, result=None, error=last_error, attempts=attempts, usage=self._llm.usage)
\ No newline at end of file
+		return AgentResponse(sql=state.sql, result=result, error=None, attempts=state.attempts, answer=answer, usage=self._llm.usage)
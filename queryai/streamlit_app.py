@@ -28,6 +28,7 @@ if str(ROOT_DIR) not in sys.path:
 	sys.path.insert(0, str(ROOT_DIR))
 
 from queryai.src.app_core import create_agent, normalize_db_uri
+from queryai.src.text2sql_agent import TextToSQLAgent
 
 # Load .env so DATABASE_URI is available
 load_dotenv()
@@ -46,6 +47,41 @@ def _get_default_db_uri() -> str:
 	return os.getenv("DATABASE_URI", "queryai/data/sample.db")
 
 
+# Agents built by _get_agent, so Reconnect can dispose a pool without
+# building an agent first; URIs whose next agent must re-read the schema.
+_LIVE_AGENTS: dict[str, TextToSQLAgent] = {}
+_SCHEMA_REFRESH_PENDING: set[str] = set()
+
+
+@st.cache_resource(show_spinner=False)
+def _get_agent(db_uri: str) -> TextToSQLAgent:
+	"""Return a process-wide agent per DB URI so the engine pool stays warm across reruns."""
+	agent = create_agent(db_uri)
+	if db_uri in _SCHEMA_REFRESH_PENDING:
+		_SCHEMA_REFRESH_PENDING.discard(db_uri)
+		# Re-introspect instead of trusting the on-disk schema copy
+		agent._db.invalidate_schema()  # type: ignore[attr-defined]
+	_LIVE_AGENTS[db_uri] = agent
+	return agent
+
+
+def _reconnect(db_uri: str, query_cache: dict) -> None:
+	"""Drop the cached agent and responses for one DB URI only."""
+	agent = _LIVE_AGENTS.pop(db_uri, None)
+	if agent is not None:
+		# Close the old pool instead of leaving it to garbage collection
+		agent._db.dispose()  # type: ignore[attr-defined]
+	_get_agent.clear(db_uri)
+	_SCHEMA_REFRESH_PENDING.add(db_uri)
+	for key in [key for key in query_cache if key[0] == db_uri]:
+		query_cache.pop(key, None)
+
+
+def _numeric_columns(df: pd.DataFrame) -> list[str]:
+	"""Return chartable numeric column names (bools included, as before)."""
+	return df.select_dtypes(include=["number", "bool"]).columns.tolist()
+
+
 def _select_chart_options(df: pd.DataFrame) -> tuple[str, Optional[str], Optional[list[str]]]:
 	"""Return (chart_type, x_column, y_columns) from Streamlit widgets."""
 
@@ -57,7 +93,7 @@ def _select_chart_options(df: pd.DataFrame) -> tuple[str, Optional[str], Optiona
 		return chart_type, None, None
 
 	columns = list(df.columns)
-	numeric_cols = [c for c in columns if pd.api.types.is_numeric_dtype(df[c])]
+	numeric_cols = _numeric_columns(df)
 
 	if not numeric_cols:
 		st.info("No numeric columns available for charts; falling back to table only.")
@@ -131,6 +167,12 @@ def main() -> None:
 			"or any SQLAlchemy URL. Set DATABASE_URI in .env to auto-fill."
 		),
 	)
+	if "query_cache" not in st.session_state:
+		st.session_state.query_cache = {}
+
+	if st.sidebar.button("Reconnect", help="Drop cached connections, rebuild the agent and refresh the schema."):
+		if db_input.strip():
+			_reconnect(normalize_db_uri(db_input), st.session_state.query_cache)
 
 	with st.form("query_form"):
 		question = st.text_area(
@@ -140,9 +182,6 @@ def main() -> None:
 		)
 		run_clicked = st.form_submit_button("Run query")
 
-	if "query_cache" not in st.session_state:
-		st.session_state.query_cache = {}
-
 	if run_clicked:
 		if not db_input.strip():
 			st.error("Please provide a database path or SQLAlchemy URL.")
@@ -158,12 +197,10 @@ def main() -> None:
 		timings: dict[str, float] = {}
 		cache_hit = False
 
-		# Cache agent in session state — avoids rebuilding LLM + DB on every click
-		if "agent" not in st.session_state or st.session_state.get("agent_db_uri") != db_uri:
-			t0 = perf_counter()
-			st.session_state.agent = create_agent(db_uri)
-			st.session_state.agent_db_uri = db_uri
-			timings["agent_init"] = perf_counter() - t0
+		# Agent is cached per DB URI across reruns and sessions
+		t0 = perf_counter()
+		agent = _get_agent(db_uri)
+		timings["agent_init"] = perf_counter() - t0
 
 		_prune_query_cache(st.session_state.query_cache, now_ts)
 		response = _get_cached_response(st.session_state.query_cache, cache_key, now_ts)
@@ -172,7 +209,8 @@ def main() -> None:
 		else:
 			with st.spinner("Running QueryAI agent..."):
 				t0 = perf_counter()
-				response = st.session_state.agent.answer_question(question)
+				# Defer the LLM answer so it can be streamed below
+				response = agent.answer_question(question, generate_answer=False)
 				timings["agent_total"] = perf_counter() - t0
 			_set_cached_response(st.session_state.query_cache, cache_key, response, now_ts)
 
@@ -225,7 +263,7 @@ def main() -> None:
 
 		with st.spinner("Running edited SQL..."):
 			t0 = perf_counter()
-			edited_response = st.session_state.agent.run_sql(
+			edited_response = _get_agent(st.session_state.last_run["db_uri"]).run_sql(
 				edited_sql,
 				question=st.session_state.last_run.get("question", ""),
 			)
@@ -249,10 +287,16 @@ def main() -> None:
 			col1.metric("API Calls", response.usage.api_calls)
 			col2.metric("Input Tokens", f"{response.usage.input_tokens:,}")
 			col3.metric("Output Tokens", f"{response.usage.output_tokens:,}")
-			st.caption(f"Total tokens: {response.usage.total_tokens:,}")
+			st.caption(
+				f"Total tokens: {response.usage.total_tokens:,}"
+				f" · Served from LLM cache: {response.usage.cached_calls}"
+			)
 			with st.expander("Call breakdown"):
 				for d in response.usage.details:
-					st.write(f"**{d['call']}** — in: {d['input_tokens']:,}  out: {d['output_tokens']:,}")
+					if d.get("cached"):
+						st.write(f"**{d['call']}** — cached (no tokens billed)")
+					else:
+						st.write(f"**{d['call']}** — in: {d['input_tokens']:,}  out: {d['output_tokens']:,}")
 
 	if response.error is not None or response.result is None:
 		st.error(
@@ -260,10 +304,18 @@ def main() -> None:
 		)
 		st.stop()
 
-	# Show natural-language answer
+	# Show natural-language answer, streaming it the first time it is needed
 	if response.answer:
 		st.subheader("Answer")
 		st.write(response.answer)
+	else:
+		st.subheader("Answer")
+		agent = _get_agent(st.session_state.last_run["db_uri"])
+		# The response object is shared with the query cache, so later
+		# reruns and cache hits reuse the streamed text.
+		response.answer = st.write_stream(
+			agent.stream_answer(st.session_state.last_run.get("question", ""), response),
+		)
 
 	df = response.result.dataframe
 	st.subheader(f"Result ({response.result.rowcount} row(s))")
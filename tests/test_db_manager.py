@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+
+from queryai.src.db_manager import AsyncDatabaseManager, DatabaseManager, to_async_uri
+
+
+def _make_db(tmp_path) -> DatabaseManager:
+	db = DatabaseManager(f"sqlite:///{tmp_path / 'test.db'}")
+	with db.engine.begin() as conn:
+		conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)"))
+	return db
+
+
+def test_schema_summary_is_cached_until_invalidated(tmp_path):
+	db = _make_db(tmp_path)
+	summary = db.get_schema_summary()
+	assert "Table users" in summary
+
+	with db.engine.begin() as conn:
+		conn.execute(text("CREATE TABLE orders (id INTEGER PRIMARY KEY)"))
+
+	assert db.get_schema_summary() == summary
+
+	db.invalidate_schema()
+	assert "Table orders" in db.get_schema_summary()
+
+
+def test_dialect_name_is_reported(tmp_path):
+	db = _make_db(tmp_path)
+	assert db.dialect_name == "sqlite"
+
+
+def test_in_memory_sqlite_shares_one_connection():
+	db = DatabaseManager("sqlite://")
+	with db.engine.begin() as conn:
+		conn.execute(text("CREATE TABLE t (x INTEGER)"))
+	assert "Table t" in db.get_schema_summary()
+
+
+def test_file_sqlite_keeps_journal_mode_by_default(tmp_path):
+	db = _make_db(tmp_path)
+	db.run_read_only_query("SELECT COUNT(*) FROM users")
+	with db.engine.connect() as conn:
+		assert conn.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+	assert not (tmp_path / "test.db-wal").exists()
+
+
+def test_file_sqlite_uses_wal_journal_when_enabled(tmp_path, monkeypatch):
+	monkeypatch.setenv("QUERYAI_SQLITE_WAL", "1")
+	db = _make_db(tmp_path)
+	with db.engine.connect() as conn:
+		assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+
+
+def test_run_read_only_query_returns_dataframe(tmp_path):
+	db = _make_db(tmp_path)
+	with db.engine.begin() as conn:
+		conn.execute(text("INSERT INTO users (name) VALUES ('ann'), ('bob')"))
+
+	result = db.run_read_only_query("SELECT id, name FROM users WHERE id > :min_id", {"min_id": 1})
+	assert result.rowcount == 1
+	assert list(result.dataframe.columns) == ["id", "name"]
+	assert result.dataframe.iloc[0]["name"] == "bob"
+
+
+def test_schema_cache_is_persisted_and_reused(tmp_path):
+	cache_dir = tmp_path / "schema_cache"
+	db = DatabaseManager(f"sqlite:///{tmp_path / 'test.db'}", schema_cache_dir=cache_dir)
+	with db.engine.begin() as conn:
+		conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)"))
+
+	summary = db.load_or_build_schema_cache(cache_dir)
+	(cache_file,) = cache_dir.glob("*.json")
+	cache_file.write_text(cache_file.read_text().replace("name (TEXT)", "name (CACHED)"))
+
+	fresh = DatabaseManager(f"sqlite:///{tmp_path / 'test.db'}", schema_cache_dir=cache_dir)
+	assert "name (CACHED)" in fresh.get_schema_summary()
+
+	with fresh.engine.begin() as conn:
+		conn.execute(text("CREATE TABLE orders (id INTEGER PRIMARY KEY)"))
+	fresh.invalidate_schema()
+	rebuilt = fresh.get_schema_summary()
+	assert "Table orders" in rebuilt
+	assert summary.splitlines()[0] in rebuilt
+
+
+def test_run_read_only_query_conn_ends_transaction(tmp_path):
+	db = _make_db(tmp_path)
+	with db.engine.connect() as conn:
+		db.run_read_only_query_conn(conn, "SELECT * FROM users")
+		assert not conn.in_transaction()
+
+
+def test_to_async_uri_maps_known_backends():
+	assert to_async_uri("sqlite:///data/x.db") == "sqlite+aiosqlite:///data/x.db"
+	assert to_async_uri("postgresql+psycopg2://u:p@h:5432/d") == "postgresql+asyncpg://u:p@h:5432/d"
+	assert to_async_uri("mysql+pymysql://u:p@h/d") == "mysql+aiomysql://u:p@h/d"
+	assert to_async_uri("mssql+pyodbc://h/d") == "mssql+pyodbc://h/d"
+
+
+def test_to_async_uri_translates_libpq_ssl_options_for_asyncpg():
+	uri = "postgresql://u:p@ep-x.neon.tech/d?sslmode=require&channel_binding=require"
+	assert to_async_uri(uri) == "postgresql+asyncpg://u:p@ep-x.neon.tech/d?ssl=require"
+
+
+def test_async_database_manager_runs_read_only_queries(tmp_path):
+	pytest.importorskip("aiosqlite")
+	pytest.importorskip("greenlet")
+	_make_db(tmp_path)
+
+	async def _run():
+		db = AsyncDatabaseManager(f"sqlite:///{tmp_path / 'test.db'}")
+		try:
+			async with db.engine.connect() as conn:
+				result = await db.run_read_only_query_conn(conn, "SELECT COUNT(*) AS n FROM users")
+				with pytest.raises(ValueError):
+					await db.run_read_only_query_conn(conn, "DELETE FROM users")
+			return result
+		finally:
+			await db.dispose()
+
+	result = asyncio.run(_run())
+	assert result.dataframe.iloc[0, 0] == 0
+
+
+def test_schema_cache_detects_column_changes(tmp_path):
+	cache_dir = tmp_path / "schema_cache"
+	db = DatabaseManager(f"sqlite:///{tmp_path / 'test.db'}", schema_cache_dir=cache_dir)
+	with db.engine.begin() as conn:
+		conn.execute(text("CREATE TABLE u (id INTEGER PRIMARY KEY)"))
+	assert db.get_schema_summary() == "Table u: id (INTEGER)"
+
+	with db.engine.begin() as conn:
+		conn.execute(text("ALTER TABLE u ADD COLUMN email TEXT"))
+
+	# A fresh process sees the changed column count and rebuilds
+	fresh = DatabaseManager(f"sqlite:///{tmp_path / 'test.db'}", schema_cache_dir=cache_dir)
+	assert "email (TEXT)" in fresh.get_schema_summary()
+
+	# Invalidation re-introspects rather than trusting the disk copy
+	with db.engine.begin() as conn:
+		conn.execute(text("ALTER TABLE u RENAME COLUMN email TO mail"))
+	db.invalidate_schema()
+	assert "mail (TEXT)" in db.get_schema_summary()
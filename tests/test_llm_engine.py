@@ -0,0 +1,73 @@
+import threading
+
+from langchain_core.language_models import FakeListChatModel
+
+from queryai.src.llm_engine import LLMEngine, _select_relevant_schema
+
+SCHEMA = "\n".join([
+	"Table Driver: id (INTEGER), name (TEXT)",
+	"Table Assignment: id (INTEGER), driverId (INTEGER), parcelsBehind (INTEGER)",
+	"Table orders: id (INTEGER), amount (REAL)",
+	"Table users: id (INTEGER), email (TEXT)",
+])
+
+
+def test_select_relevant_schema_keeps_top_tables_in_original_order():
+	pruned = _select_relevant_schema("How many parcels is driver Sam behind?", SCHEMA, k=2)
+	assert pruned.splitlines() == SCHEMA.splitlines()[:2]
+
+
+def test_select_relevant_schema_returns_full_schema_without_matches():
+	assert _select_relevant_schema("What is the weather?", SCHEMA, k=1) == SCHEMA
+
+
+def test_select_relevant_schema_is_noop_for_small_schemas():
+	assert _select_relevant_schema("List users", SCHEMA, k=10) == SCHEMA
+
+
+def test_generate_sql_reuses_in_process_cache():
+	engine = LLMEngine(FakeListChatModel(responses=["SELECT 1", "SELECT 2"]))
+	first = engine.generate_sql("q", SCHEMA, dialect="sqlite")
+	second = engine.generate_sql("q", SCHEMA, dialect="sqlite")
+	assert first == second == "SELECT 1"
+	assert engine.usage.api_calls == 1
+	assert engine.generate_sql("q", SCHEMA, dialect="postgresql") == "SELECT 2"
+
+
+def test_usage_is_tracked_per_thread():
+	engine = LLMEngine(FakeListChatModel(responses=["SELECT 1", "SELECT 2"]))
+	engine.reset_usage()
+	main_usage = engine.usage
+
+	def _other_request():
+		engine.reset_usage()
+		engine.generate_sql("other", SCHEMA)
+
+	worker = threading.Thread(target=_other_request)
+	worker.start()
+	worker.join()
+
+	assert engine.usage is main_usage
+	assert main_usage.api_calls == 0
+
+
+def test_llm_cache_hits_are_not_counted_as_api_calls():
+	from langchain_core.caches import InMemoryCache
+	from langchain_core.globals import get_llm_cache, set_llm_cache
+
+	from queryai.src.llm_engine import CacheHitTracker
+
+	previous = get_llm_cache()
+	set_llm_cache(CacheHitTracker(InMemoryCache()))
+	try:
+		LLMEngine(FakeListChatModel(responses=["SELECT 1"])).generate_sql("q", SCHEMA)
+
+		# Same parameters, so the prompt resolves to the same cache entry
+		replay_llm = FakeListChatModel(responses=["SELECT 1"])
+		engine = LLMEngine(replay_llm)
+		assert engine.generate_sql("q", SCHEMA) == "SELECT 1"
+		assert replay_llm.i == 0
+		assert engine.usage.api_calls == 0
+		assert engine.usage.cached_calls == 1
+	finally:
+		set_llm_cache(previous)
@@ -16,3 +16,12 @@ def test_is_read_only_sql_blocks_dml_and_ddl():
     ]
     for sql in blocked:
         assert is_read_only_sql(sql) is False
+
+
+def test_is_read_only_sql_allows_keyword_substrings_in_identifiers():
+    assert is_read_only_sql("SELECT id, deleted_at FROM users WHERE deleted_at IS NULL") is True
+    assert is_read_only_sql("SELECT updated_by FROM audit") is True
+
+
+def test_is_read_only_sql_is_case_insensitive():
+    assert is_read_only_sql("delete from users") is False
@@ -0,0 +1,49 @@
+import pandas as pd
+
+from queryai import streamlit_app
+from queryai.streamlit_app import _numeric_columns, _reconnect
+
+
+def test_numeric_columns_matches_per_column_dtype_check_on_wide_frame():
+	data = {}
+	for i in range(200):
+		kind = i % 4
+		if kind == 0:
+			data[f"c{i}"] = [1, 2]
+		elif kind == 1:
+			data[f"c{i}"] = [1.5, 2.5]
+		elif kind == 2:
+			data[f"c{i}"] = ["a", "b"]
+		else:
+			data[f"c{i}"] = [True, False]
+	df = pd.DataFrame(data)
+
+	expected = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+	assert _numeric_columns(df) == expected
+	assert len(expected) == 150
+
+
+class _FakeDb:
+	disposed = False
+
+	def dispose(self) -> None:
+		self.disposed = True
+
+
+class _FakeAgent:
+	def __init__(self) -> None:
+		self._db = _FakeDb()
+
+
+def test_reconnect_only_drops_the_current_uri(monkeypatch):
+	current, other = _FakeAgent(), _FakeAgent()
+	monkeypatch.setattr(streamlit_app, "_LIVE_AGENTS", {"sqlite:///a.db": current, "sqlite:///b.db": other})
+	monkeypatch.setattr(streamlit_app, "_SCHEMA_REFRESH_PENDING", set())
+	query_cache = {("sqlite:///a.db", "q1"): {}, ("sqlite:///b.db", "q1"): {}}
+
+	_reconnect("sqlite:///a.db", query_cache)
+
+	assert current._db.disposed and not other._db.disposed
+	assert list(query_cache) == [("sqlite:///b.db", "q1")]
+	assert streamlit_app._LIVE_AGENTS == {"sqlite:///b.db": other}
+	assert streamlit_app._SCHEMA_REFRESH_PENDING == {"sqlite:///a.db"}
@@ -0,0 +1,281 @@
+import asyncio
+from typing import Optional
+
+import pandas as pd
+import pytest
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from sqlalchemy import event, text
+
+from queryai.src.db_manager import AsyncDatabaseManager, DatabaseManager, QueryResult
+from queryai.src.llm_engine import LLMEngine, SqlPlan
+from queryai.src.text2sql_agent import TextToSQLAgent
+
+
+class BadRequestError(Exception):
+	"""Stand-in for a provider SDK's HTTP 400 error."""
+
+	status_code = 400
+
+
+class _PlanChatModel(FakeListChatModel):
+	"""Fake model whose structured output returns ``plan`` (or raises).
+
+	Errors in ``plan_errors`` are raised first, one per call.
+	"""
+
+	plan: Optional[SqlPlan] = None
+	plan_calls: int = 0
+	plan_errors: list = []
+
+	def with_structured_output(self, schema, **kwargs):
+		def _invoke(_prompt):
+			self.plan_calls += 1
+			if self.plan_errors:
+				raise self.plan_errors.pop(0)
+			if self.plan is None:
+				raise BadRequestError("response_format is not supported by this model")
+			return {"raw": AIMessage(content=""), "parsed": self.plan.model_copy(), "parsing_error": None}
+
+		return RunnableLambda(_invoke)
+
+
+def _make_agent(
+	tmp_path,
+	responses: list[str],
+	max_retries: int = 2,
+	llm: Optional[FakeListChatModel] = None,
+	use_async_db: bool = False,
+) -> TextToSQLAgent:
+	db = DatabaseManager(f"sqlite:///{tmp_path / 'test.db'}")
+	with db.engine.begin() as conn:
+		conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)"))
+		conn.execute(text("INSERT INTO users (name) VALUES ('ann'), ('bob')"))
+	engine = LLMEngine(llm or FakeListChatModel(responses=responses))
+	async_db = AsyncDatabaseManager(f"sqlite:///{tmp_path / 'test.db'}") if use_async_db else None
+	return TextToSQLAgent(db=db, llm_engine=engine, max_retries=max_retries, async_db=async_db)
+
+
+def test_answer_question_falls_back_when_structured_output_unsupported(tmp_path):
+	agent = _make_agent(tmp_path, ["SELECT COUNT(*) AS n FROM users"])
+	response = agent.answer_question("How many users are there?")
+	assert response.error is None
+	assert response.answer == "The answer is: 2"
+	assert response.usage.api_calls == 1
+
+
+def test_render_answer_template_fills_result_stats():
+	result = QueryResult(dataframe=pd.DataFrame({"name": ["ann", "bob"], "n": [1, 2]}), rowcount=2)
+	answer = TextToSQLAgent._render_answer_template("Found {rowcount} rows ({columns}).", result)
+	assert answer == "Found 2 rows (name, n)."
+
+
+def test_render_answer_template_rejects_unknown_placeholders():
+	result = QueryResult(dataframe=pd.DataFrame({"n": [1]}), rowcount=1)
+	assert TextToSQLAgent._render_answer_template("Total {total}", result) is None
+
+
+def test_render_answer_template_does_not_evaluate_format_fields():
+	result = QueryResult(dataframe=pd.DataFrame({"n": [1]}), rowcount=1)
+	assert TextToSQLAgent._render_answer_template("{value.x}", result) is None
+	assert TextToSQLAgent._render_answer_template("{rowcount[0]}", result) is None
+
+
+def test_answer_question_uses_plan_template_without_answer_call(tmp_path):
+	llm = _PlanChatModel(
+		responses=["unused"],
+		plan=SqlPlan(
+			sql="SELECT id, name FROM users",
+			answer_template="There are {rowcount} users.",
+			needs_summary=False,
+		),
+	)
+	agent = _make_agent(tmp_path, [], llm=llm)
+	response = agent.answer_question("List all users")
+	assert response.error is None
+	assert response.answer == "There are 2 users."
+	assert response.usage.api_calls == 1
+
+
+def test_answer_question_drops_plan_template_after_refinement(tmp_path):
+	llm = _PlanChatModel(
+		responses=["SELECT id, name FROM users", "Two users: ann and bob."],
+		plan=SqlPlan(
+			sql="SELECT name, total FROM top_customer",
+			answer_template="The top customer is {value}.",
+			needs_summary=False,
+		),
+	)
+	agent = _make_agent(tmp_path, [], llm=llm)
+	response = agent.answer_question("Who is the top customer?")
+	assert response.sql == "SELECT id, name FROM users"
+	assert response.answer == "Two users: ann and bob."
+
+
+def test_answer_question_reuses_plan_for_cached_sql(tmp_path):
+	llm = _PlanChatModel(
+		responses=["unused"],
+		plan=SqlPlan(
+			sql="SELECT id, name FROM users",
+			answer_template="There are {rowcount} users.",
+			needs_summary=False,
+		),
+	)
+	agent = _make_agent(tmp_path, [], llm=llm)
+	agent.answer_question("List all users")
+	response = agent.answer_question("List all users")
+	assert response.answer == "There are 2 users."
+	assert response.usage.api_calls == 0
+	assert llm.plan_calls == 1
+
+
+def test_sql_cache_is_bounded(tmp_path, monkeypatch):
+	monkeypatch.setattr("queryai.src.text2sql_agent.SQL_CACHE_MAX_ENTRIES", 1)
+	agent = _make_agent(tmp_path, ["SELECT COUNT(*) FROM users", "SELECT name FROM users"])
+	agent.answer_question("How many users?")
+	agent.answer_question("Which users?")
+	assert list(agent._sql_cache) == ["which users?"]
+
+
+def test_answer_question_falls_back_when_provider_rejects_plan(tmp_path):
+	llm = _PlanChatModel(responses=["SELECT COUNT(*) AS n FROM users", "SELECT COUNT(*) AS n FROM users"])
+	agent = _make_agent(tmp_path, [], llm=llm)
+	response = agent.answer_question("How many users are there?")
+	assert response.error is None
+	assert response.answer == "The answer is: 2"
+
+	# The fused call is not retried once the provider rejected it
+	agent.answer_question("How many users exist?")
+	assert llm.plan_calls == 1
+
+
+def test_answer_question_retries_plan_after_transient_error(tmp_path):
+	llm = _PlanChatModel(
+		responses=["SELECT COUNT(*) AS n FROM users"],
+		plan=SqlPlan(
+			sql="SELECT id, name FROM users",
+			answer_template="There are {rowcount} users.",
+			needs_summary=False,
+		),
+		plan_errors=[TimeoutError("request timed out")],
+	)
+	agent = _make_agent(tmp_path, [], llm=llm)
+	assert agent.answer_question("How many users are there?").answer == "The answer is: 2"
+
+	# A timeout skips the fused call once instead of disabling it
+	assert agent.answer_question("List all users").answer == "There are 2 users."
+	assert llm.plan_calls == 2
+
+
+def test_aanswer_question_matches_sync_path(tmp_path):
+	agent = _make_agent(tmp_path, ["SELECT name FROM users ORDER BY id"])
+	response = asyncio.run(agent.aanswer_question("List user names"))
+	assert response.error is None
+	assert response.answer == "Here are the name (2 result(s)): ann, bob"
+
+
+def test_results_to_text_summarizes_large_results():
+	df = pd.DataFrame({"id": range(1000), "label": [f"row{i}" for i in range(1000)]})
+	text_value = TextToSQLAgent._results_to_text(QueryResult(dataframe=df, rowcount=1000))
+	assert text_value.startswith("1000 rows total.")
+	assert "row19" in text_value and "row999" in text_value
+	assert "row500" not in text_value
+	assert "Numeric stats:" in text_value
+
+
+def test_aanswer_question_checks_out_one_connection_for_all_attempts(tmp_path):
+	agent = _make_agent(tmp_path, ["SELECT * FROM people", "SELECT name FROM users"])
+	agent._db.get_schema_summary()
+	checkouts = []
+	event.listen(agent._db.engine, "checkout", lambda *args: checkouts.append(args))
+
+	response = asyncio.run(agent.aanswer_question("List people"))
+	assert response.error is None
+	assert response.attempts == 2
+	assert len(checkouts) == 1
+
+
+def test_aanswer_question_uses_async_db_when_configured(tmp_path):
+	pytest.importorskip("aiosqlite")
+	pytest.importorskip("greenlet")
+	agent = _make_agent(tmp_path, ["SELECT * FROM people", "SELECT name FROM users"], use_async_db=True)
+
+	async def _run():
+		try:
+			return await agent.aanswer_question("List people")
+		finally:
+			await agent._async_db.dispose()
+
+	response = asyncio.run(_run())
+	assert response.error is None
+	assert response.attempts == 2
+	assert response.answer == "Here are the name (2 result(s)): ann, bob"
+
+
+def test_answer_question_does_not_refine_unsafe_sql(tmp_path):
+	agent = _make_agent(tmp_path, ["DELETE FROM users", "SELECT 1"])
+	response = agent.answer_question("Remove all users")
+	assert response.result is None
+	assert "read-only" in response.error
+	assert response.usage.api_calls == 1
+
+
+def test_answer_question_refines_missing_table_only_once(tmp_path):
+	agent = _make_agent(
+		tmp_path,
+		["SELECT * FROM people", "SELECT * FROM persons", "SELECT * FROM users"],
+		max_retries=3,
+	)
+	response = agent.answer_question("List people")
+	assert response.result is None
+	assert "no such table" in response.error
+	assert response.usage.api_calls == 2
+
+
+def test_answer_question_checks_out_one_connection_for_all_attempts(tmp_path):
+	agent = _make_agent(tmp_path, ["SELECT * FROM people", "SELECT name FROM users"])
+	agent._db.get_schema_summary()
+	checkouts = []
+	event.listen(agent._db.engine, "checkout", lambda *args: checkouts.append(args))
+
+	response = agent.answer_question("List people")
+	assert response.error is None
+	assert response.attempts == 2
+	assert len(checkouts) == 1
+
+
+def test_stream_answer_yields_deferred_llm_answer(tmp_path):
+	agent = _make_agent(tmp_path, ["SELECT id, name FROM users", "Ann and Bob."])
+	response = agent.answer_question("Who are the users?", generate_answer=False)
+	assert response.error is None
+	assert response.answer is None
+
+	streamed = "".join(agent.stream_answer("Who are the users?", response))
+	assert streamed == "Ann and Bob."
+	assert response.usage.api_calls == 2
+
+
+def test_answer_question_formats_empty_result_without_llm(tmp_path):
+	agent = _make_agent(tmp_path, ["SELECT name FROM users WHERE id > 10"])
+	response = agent.answer_question("Which users have id above 10?")
+	assert response.error is None
+	assert response.answer == "No matching data was found."
+	assert response.usage.api_calls == 1
+
+
+def test_answer_question_returns_connection_before_answer_call(tmp_path):
+	agent = _make_agent(tmp_path, ["SELECT id, name FROM users", "Ann and Bob."])
+	pool = agent._db.engine.pool
+	seen = []
+
+	generate_answer = agent._llm.generate_answer
+
+	def _generate_answer(**kwargs):
+		seen.append(pool.checkedout())
+		return generate_answer(**kwargs)
+
+	agent._llm.generate_answer = _generate_answer
+	response = agent.answer_question("Who are the users?")
+	assert response.answer == "Ann and Bob."
+	assert seen == [0]